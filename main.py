@@ -1,13 +1,20 @@
 import os
-import hashlib
-import json
+import errno
+import re
 import shutil
 import zipfile
 from datetime import datetime
 from zoneinfo import ZoneInfo
 import piexif
 from piexif._exceptions import InvalidImageDataError
+import sqlite3
+import struct
 import pickle
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+import xxhash
+import orjson
+from tqdm import tqdm
 
 # ---------------------------------------------------------------------
 # Adjust these paths/configuration as needed
@@ -33,10 +40,55 @@ ONEDRIVE_DUPLICATES_DIR = r"C:\Users\shaun\OneDrive\duplicates"
 # 6. The timezone you want to convert from UTC to MST
 MST_TZ = ZoneInfo("America/Edmonton")
 
+# 7. Number of threads used to hash files in parallel (hashing is IO-bound)
+HASH_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# 8. SQLite cache of OneDrive hashes and JSON dates, reused between runs
+CACHE_DB = "cache.db"
+CACHE_BATCH_SIZE = 500
+
+# 9. Pickled JSON dates written by older versions; imported once into CACHE_DB
+LEGACY_DATES_PICKLE = "dates.dict"
+
 # ---------------------------------------------------------------------
 # Helper functions
 # ---------------------------------------------------------------------
 
+_UTC = ZoneInfo("UTC")
+
+# Bump when the format of cached rows changes, so open_cache discards them
+_CACHE_VERSION = 4
+
+# Fast paths for the canonical Google Photos layout, e.g.
+#   "photoTakenTime": {"timestamp": "1528900621", "formatted": ...}
+_TS_RE = re.compile(rb'"photoTakenTime"\s*:\s*\{\s*"timestamp"\s*:\s*"(\d+)"')
+_CT_RE = re.compile(rb'"creationTime"\s*:\s*\{\s*"timestamp"\s*:\s*"(\d+)"')
+
+# Chunks kept in flight ahead of the hashing loop, where the OS supports it
+_HAVE_FADVISE = hasattr(os, "posix_fadvise")
+_READAHEAD_CHUNKS = 8
+
+# os.O_SEQUENTIAL only exists on Windows, where it sets FILE_FLAG_SEQUENTIAL_SCAN
+_SEQUENTIAL_READ_FLAGS = (
+    os.O_RDONLY | getattr(os, "O_BINARY", 0) | getattr(os, "O_SEQUENTIAL", 0)
+)
+
+
+def progress(iterable, total, desc):
+    """
+    Wrap iterable in a progress bar. Redraws are throttled to ~10 per second
+    (and at most ~1000 over the whole run), so per-file console output
+    doesn't cost more than the work itself.
+    """
+    return tqdm(
+        iterable,
+        total=total,
+        desc=desc,
+        unit="file",
+        mininterval=0.1,
+        miniters=max(1, total // 1000),
+    )
+
 
 def unzip_takeout_zips(zip_folder, extract_target):
     """
@@ -52,29 +104,98 @@ def unzip_takeout_zips(zip_folder, extract_target):
     print("All Takeout .zip files have been extracted.")
 
 
-def compute_file_hash(filepath, chunk_size=65536):
+def _open_sequential(path):
     """
-    Compute an MD5 hash of a file’s contents.
+    Open path as an unbuffered binary file for a single front-to-back read,
+    telling the OS about the access pattern so it can read ahead and drop
+    pages early (O_SEQUENTIAL on Windows, POSIX_FADV_SEQUENTIAL elsewhere).
     """
-    md5 = hashlib.md5()
-    with open(filepath, "rb") as f:
-        while True:
-            data = f.read(chunk_size)
-            if not data:
-                break
-            md5.update(data)
-    return md5.hexdigest()
+    f = open(os.open(path, _SEQUENTIAL_READ_FLAGS), "rb", buffering=0)
+    if _HAVE_FADVISE:
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except BaseException:
+            f.close()
+            raise
+    return f
+
+
+def _read_chunks(f, mv):
+    """
+    Yield successive chunks of the unbuffered file f, each read into (a slice of) mv.
+    Where posix_fadvise is available (Linux), the next _READAHEAD_CHUNKS chunks are
+    kept queued with the kernel, so disk reads overlap with hashing. Elsewhere
+    (e.g. Windows) this is a plain read loop.
+    """
+    fd = f.fileno()
+    chunk_size = len(mv)
+    window = chunk_size * _READAHEAD_CHUNKS
+    if _HAVE_FADVISE:
+        os.posix_fadvise(fd, 0, window, os.POSIX_FADV_WILLNEED)
+    offset = 0
+    while True:
+        n = f.readinto(mv)
+        if not n:
+            return
+        if _HAVE_FADVISE:
+            # Slide the read-ahead window past the chunk just consumed
+            os.posix_fadvise(fd, offset + window, chunk_size, os.POSIX_FADV_WILLNEED)
+        offset += n
+        yield mv[:n]
+
+
+def new_hasher():
+    """
+    Return a fresh hash object for file contents. Duplicate detection doesn't
+    need a cryptographic hash, so this is the much faster 128-bit XXH3.
+    """
+    return xxhash.xxh3_128()
+
+
+def compute_file_hash(filepath, chunk_size=1 << 20):
+    """
+    Compute an XXH3-128 hash of a file’s contents, as raw digest bytes.
+    Reads go straight from an unbuffered, sequential-hinted file descriptor
+    into one reusable buffer, so each chunk is copied once and hashed in place.
+    """
+    hasher = new_hasher()
+    buf = bytearray(chunk_size)
+    mv = memoryview(buf)
+    try:
+        with _open_sequential(filepath) as f:
+            for chunk in _read_chunks(f, mv):
+                hasher.update(chunk)
+    finally:
+        mv.release()
+        del buf
+    return hasher.digest()
 
 
 def find_files_recursive(base_dir):
     """
-    Recursively yield full file paths under base_dir.
+    Recursively yield os.DirEntry objects for files under base_dir.
+    Entries carry the stat data from the directory listing, so callers
+    don't need another stat call per file.
+    Like os.walk, symlinked directories are not followed and unreadable
+    directories are skipped.
     """
-    for root, dirs, files in os.walk(base_dir):
-        for fname in files:
-            if fname.startswith("."):
+    stack = [base_dir]
+    while stack:
+        try:
+            # List the whole directory up front (as os.walk does), so callers
+            # can move or create files in it while iterating.
+            with os.scandir(stack.pop()) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir():
+                if not entry.is_symlink():
+                    stack.append(entry.path)
+                continue
+            if entry.name.startswith("."):
                 continue
-            yield os.path.join(root, fname)
+            yield entry
 
 
 def get_json_date(json_path):
@@ -85,24 +206,34 @@ def get_json_date(json_path):
     If neither is available, return None.
     """
     # try:
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    # e.g.,
-    # {
-    #   "creationTime": {"timestamp": "1636834808"},
-    #   "photoTakenTime": {"timestamp": "1528900621"},
-    #   ...
-    # }
-    if "photoTakenTime" in data and "timestamp" in data["photoTakenTime"]:
-        ts_str = data["photoTakenTime"]["timestamp"]
-    elif "creationTime" in data and "timestamp" in data["creationTime"]:
-        ts_str = data["creationTime"]["timestamp"]
+    with open(json_path, "rb") as f:
+        raw = f.read()
+
+    # Pull the timestamp straight out of the bytes when the file has the
+    # usual layout; only fall back to a full parse when that fails.
+    m = _TS_RE.search(raw)
+    if m is None and b'"photoTakenTime"' not in raw:
+        m = _CT_RE.search(raw)
+    if m is not None:
+        ts_str = m.group(1)
     else:
-        return None
+        data = orjson.loads(raw)
+        # e.g.,
+        # {
+        #   "creationTime": {"timestamp": "1636834808"},
+        #   "photoTakenTime": {"timestamp": "1528900621"},
+        #   ...
+        # }
+        if "photoTakenTime" in data and "timestamp" in data["photoTakenTime"]:
+            ts_str = data["photoTakenTime"]["timestamp"]
+        elif "creationTime" in data and "timestamp" in data["creationTime"]:
+            ts_str = data["creationTime"]["timestamp"]
+        else:
+            return None
 
     # Convert string timestamp to int, then to a UTC datetime
     ts = int(ts_str)
-    dt_utc = datetime.fromtimestamp(ts, ZoneInfo("UTC"))
+    dt_utc = datetime.fromtimestamp(ts, _UTC)
     return dt_utc
 
 
@@ -111,25 +242,146 @@ def get_json_date(json_path):
 #  return None
 
 
+def _parse_one_json(json_path):
+    """
+    Pool worker: return (path of the file the JSON describes, its UTC date or None).
+    A Google Photos metadata file is named after its photo plus ".json".
+    """
+    return json_path[:-5], get_json_date(json_path)
+
+
+def parse_exif_datetime(s):
+    """
+    Parse an EXIF date string (bytes, "YYYY:MM:DD HH:MM:SS") into a naive datetime.
+    The layout is fixed, so the digits are sliced out directly; anything else
+    goes through strptime.
+    """
+    if len(s) == 19:
+        try:
+            return datetime(
+                int(s[0:4]),
+                int(s[5:7]),
+                int(s[8:10]),
+                int(s[11:13]),
+                int(s[14:16]),
+                int(s[17:19]),
+            )
+        except ValueError:
+            pass
+    return datetime.strptime(s.decode("utf-8"), "%Y:%m:%d %H:%M:%S")
+
+
+def _ifd_entry(tiff, ifd_offset, tag, endian):
+    """
+    Scan one TIFF IFD for tag; return (type, count, value) where value is the
+    raw 4-byte value/offset field, or None if the tag is not present.
+    """
+    (n,) = struct.unpack_from(endian + "H", tiff, ifd_offset)
+    for pos in range(ifd_offset + 2, ifd_offset + 2 + 12 * n, 12):
+        entry_tag, typ, count = struct.unpack_from(endian + "HHI", tiff, pos)
+        if entry_tag == tag:
+            return typ, count, tiff[pos + 8 : pos + 12]
+    return None
+
+
+def fast_read_datetimeoriginal(path):
+    """
+    Return the raw EXIF 'DateTimeOriginal' (tag 0x9003) of a JPEG as bytes,
+    or None if the file has no such tag.
+    Only the JPEG segment headers, IFD0 and the Exif IFD are read, instead of
+    every IFD and the thumbnail as piexif.load does.
+    Raises ValueError if the file is not laid out the way this reader expects.
+    """
+    with open(path, "rb") as f:
+        if f.read(2) != b"\xff\xd8":
+            raise ValueError("not a JPEG")
+        while True:
+            header = f.read(4)
+            if len(header) < 4 or header[0] != 0xFF:
+                raise ValueError("malformed JPEG segment")
+            marker = header[1]
+            if marker in (0xDA, 0xD9):
+                # Start of scan / end of image: no metadata segments remain
+                return None
+            seg_len = int.from_bytes(header[2:4], "big") - 2
+            if seg_len < 0:
+                raise ValueError("malformed JPEG segment")
+            if marker != 0xE1:
+                f.seek(seg_len, os.SEEK_CUR)
+                continue
+            segment = f.read(seg_len)
+            if segment[:6] == b"Exif\x00\x00":
+                break
+            # Another APP1 payload (e.g. XMP); keep looking
+
+    tiff = memoryview(segment)[6:]
+    try:
+        endian = {b"II": "<", b"MM": ">"}[bytes(tiff[:2])]
+        (ifd0,) = struct.unpack_from(endian + "I", tiff, 4)
+        exif_ptr = _ifd_entry(tiff, ifd0, 0x8769, endian)
+        if exif_ptr is None:
+            return None
+        (exif_ifd,) = struct.unpack_from(endian + "I", exif_ptr[2])
+        entry = _ifd_entry(tiff, exif_ifd, piexif.ExifIFD.DateTimeOriginal, endian)
+        if entry is None:
+            return None
+        typ, count, value = entry
+        if count > 4:
+            (offset,) = struct.unpack_from(endian + "I", value)
+            value = tiff[offset : offset + count]
+            if len(value) != count:
+                raise ValueError("EXIF value runs past the APP1 segment")
+        return bytes(value[:count]).rstrip(b"\x00")
+    except (KeyError, struct.error) as e:
+        raise ValueError(f"malformed EXIF data: {e}") from None
+
+
 def read_exif_date(image_path):
     """
     Read EXIF 'DateTimeOriginal' from the file. Return a datetime (UTC-naive),
     or None if not found or if file has no EXIF.
     """
     try:
-        exif_dict = piexif.load(image_path)
-        datetime_str = exif_dict["Exif"].get(piexif.ExifIFD.DateTimeOriginal, None)
+        try:
+            datetime_str = fast_read_datetimeoriginal(image_path)
+        except ValueError:
+            # Unusual layout; let the full parser make sense of it
+            exif_dict = piexif.load(image_path)
+            datetime_str = exif_dict["Exif"].get(piexif.ExifIFD.DateTimeOriginal, None)
         if datetime_str:
-            # Typically in format "YYYY:MM:DD HH:MM:SS"
-            dt_obj = datetime.strptime(
-                datetime_str.decode("utf-8"), "%Y:%m:%d %H:%M:%S"
-            )
-            return dt_obj
+            return parse_exif_datetime(datetime_str)
     except Exception:
         pass
     return None
 
 
+def splice_exif_segment(data, exif_bytes):
+    """
+    Return the JPEG bytes in data with its Exif APP1 segment replaced by exif_bytes
+    (as produced by piexif.dump). If there is no Exif segment yet, the new one is
+    inserted right after SOI and any leading APP0 (JFIF) segments.
+    """
+    if data[:2] != b"\xff\xd8":
+        raise InvalidImageDataError("not a JPEG")
+    if len(exif_bytes) > 0xFFFF - 2:
+        raise InvalidImageDataError("EXIF data too large for an APP1 segment")
+    app1 = b"\xff\xe1" + struct.pack(">H", len(exif_bytes) + 2) + exif_bytes
+
+    pos = insert_at = 2
+    while pos + 4 <= len(data) and data[pos] == 0xFF:
+        marker = data[pos + 1]
+        if marker in (0xDA, 0xD9):
+            # Start of scan / end of image: no metadata segments remain
+            break
+        end = pos + 2 + int.from_bytes(data[pos + 2 : pos + 4], "big")
+        if marker == 0xE1 and data[pos + 4 : pos + 10] == b"Exif\x00\x00":
+            return data[:pos] + app1 + data[end:]
+        if marker == 0xE0 and insert_at == pos:
+            insert_at = end
+        pos = end
+    return data[:insert_at] + app1 + data[insert_at:]
+
+
 def write_exif_date(image_path, dt):
     """
     Supplement the existing EXIF data with a 'DateTimeOriginal' (and 'DateTimeDigitized')
@@ -138,14 +390,26 @@ def write_exif_date(image_path, dt):
     :param image_path: Full path to the image.
     :param dt: A Python datetime object (assumed local time) to write if missing.
     """
+    # Read the image once; both the EXIF parse and the splice work on these bytes
+    with open(image_path, "rb") as f:
+        data = f.read()
+
     try:
-        exif_dict = piexif.load(image_path)
+        exif_dict = piexif.load(data)
     except Exception:
         # If the image has no EXIF segment, create a minimal structure
         exif_dict = {"0th": {}, "Exif": {}, "GPS": {}, "1st": {}, "thumbnail": None}
 
     # Format the datetime as EXIF expects: "YYYY:MM:DD HH:MM:SS"
-    dt_str = dt.strftime("%Y:%m:%d %H:%M:%S").encode("utf-8")
+    # (bytes % formatting, which skips strftime's locale handling)
+    dt_str = b"%04d:%02d:%02d %02d:%02d:%02d" % (
+        dt.year,
+        dt.month,
+        dt.day,
+        dt.hour,
+        dt.minute,
+        dt.second,
+    )
 
     # Check if DateTimeOriginal is missing or set to a 'zero' placeholder
     existing_dtorig = exif_dict["Exif"].get(piexif.ExifIFD.DateTimeOriginal, b"")
@@ -167,9 +431,22 @@ def write_exif_date(image_path, dt):
     # Save updated EXIF
     exif_bytes = piexif.dump(exif_dict)
     try:
-        piexif.insert(exif_bytes, image_path)
+        new_data = splice_exif_segment(data, exif_bytes)
     except InvalidImageDataError:
-        print(f"Skipping file with invalid data: {image_path}")
+        tqdm.write(f"Skipping file with invalid data: {image_path}")
+        return
+
+    # Write to a temp file and swap it in, so the image is rewritten in one go
+    tmp_path = image_path + ".exif.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(new_data)
+        os.replace(tmp_path, image_path)
+    except BaseException:
+        # Don't leave the temp file behind in the folder being processed
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
 
 def get_final_date_for_file(file_path, json_date_utc):
@@ -186,10 +463,9 @@ def get_final_date_for_file(file_path, json_date_utc):
     else:
         # If no EXIF, but we have JSON date, convert it to MST
         if json_date_utc is not None:
-            # Convert from naive UTC to MST
-            dt_mst = json_date_utc.replace(tzinfo=ZoneInfo("UTC")).astimezone(MST_TZ)
-            # Convert back to naive local time (if you want the EXIF to just hold local time)
-            dt_naive = dt_mst.replace(tzinfo=None)
+            # Convert from (aware) UTC to MST, then drop the tzinfo so
+            # the EXIF just holds local time
+            dt_naive = json_date_utc.astimezone(MST_TZ).replace(tzinfo=None)
             # Write EXIF date
             write_exif_date(file_path, dt_naive)
             return dt_naive
@@ -197,10 +473,10 @@ def get_final_date_for_file(file_path, json_date_utc):
             return None
 
 
-def move_file_to_year_folder(file_path, base_output_dir, dt):
+def year_folder_path(file_path, base_output_dir, dt):
     """
-    Move file to a year-based folder in base_output_dir.
-    If dt is None, move to 'unknown' folder.
+    Return the path file_path should have in a year-based folder in base_output_dir,
+    creating the folder. If dt is None, use the 'unknown' folder.
     """
     if dt is None:
         target_dir = os.path.join(base_output_dir, "unknown")
@@ -211,30 +487,177 @@ def move_file_to_year_folder(file_path, base_output_dir, dt):
     os.makedirs(target_dir, exist_ok=True)
 
     filename = os.path.basename(file_path)
-    new_path = os.path.join(target_dir, filename)
+    return os.path.join(target_dir, filename)
+
+
+def move_file_to_year_folder(file_path, base_output_dir, dt):
+    """
+    Move file to a year-based folder in base_output_dir.
+    If dt is None, move to 'unknown' folder.
+    """
+    new_path = year_folder_path(file_path, base_output_dir, dt)
 
-    # Move (not copy) so we don't leave duplicates behind
-    shutil.move(file_path, new_path)
+    # Move (not copy) so we don't leave duplicates behind. On the same volume
+    # this is a plain rename; only fall back to copy+delete across volumes.
+    try:
+        os.replace(file_path, new_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(file_path, new_path)
     return new_path
 
 
-def build_onedrive_hashmap(onedrive_dir):
+def hash_and_move(src, dst, chunk_size=1 << 20):
     """
-    Recursively hash files in OneDrive, building a dict: { filehash: [list_of_paths] }.
+    Move src to dst and return (dst, filehash), with the same hash
+    compute_file_hash(dst) would give. On the same volume the file is renamed
+    and then hashed; across volumes it is hashed as it is copied, so it is
+    still only read once.
+    """
+    try:
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    else:
+        return dst, compute_file_hash(dst)
+
+    hasher = new_hasher()
+    buf = bytearray(chunk_size)
+    mv = memoryview(buf)
+    try:
+        with _open_sequential(src) as fin, open(dst, "wb") as fout:
+            for chunk in _read_chunks(fin, mv):
+                hasher.update(chunk)
+                fout.write(chunk)
+    finally:
+        mv.release()
+        del buf
+    # Keep timestamps like shutil.move, and don't leave duplicates behind
+    shutil.copystat(src, dst)
+    os.remove(src)
+    return dst, hasher.digest()
+
+
+def open_cache(db_path):
+    """
+    Open (creating if needed) the SQLite cache of OneDrive file hashes,
+    Google Photos JSON dates and already-organized Google Photos files.
+    """
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    (version,) = conn.execute("PRAGMA user_version").fetchone()
+    if version != _CACHE_VERSION:
+        # Rows stored in an older format or layout can't be reused; rebuild them
+        conn.execute("DROP TABLE IF EXISTS onedrive")
+        conn.execute("DROP TABLE IF EXISTS takeout_json")
+        conn.execute("DROP TABLE IF EXISTS organized")
+        conn.execute(f"PRAGMA user_version = {_CACHE_VERSION}")
+    # WITHOUT ROWID keeps each row once, in the primary key b-tree, instead of
+    # in a rowid table plus a separate index on path
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS onedrive "
+        "(path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, hash BLOB) "
+        "WITHOUT ROWID"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS takeout_json "
+        "(path TEXT PRIMARY KEY, ts INTEGER) WITHOUT ROWID"
+    )
+    # Takeout files already moved: source path -> organized path
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS organized "
+        "(src TEXT PRIMARY KEY, path TEXT) WITHOUT ROWID"
+    )
+    conn.commit()
+    return conn
+
+
+def import_legacy_dates(conn, pickle_path):
+    """
+    One-time migration of the pickled { path: datetime } JSON dates from older
+    versions into the takeout_json table of conn.
+    Return the dates, or an empty dict if there is no (non-empty) pickle.
+    """
+    if not os.path.isfile(pickle_path) or os.path.getsize(pickle_path) == 0:
+        return {}
+    with open(pickle_path, "rb") as f:
+        json_dates = pickle.load(f)
+    conn.executemany(
+        "INSERT OR REPLACE INTO takeout_json VALUES (?, ?)",
+        ((path, int(dt.timestamp())) for path, dt in json_dates.items()),
+    )
+    conn.commit()
+    return json_dates
+
+
+def build_onedrive_sizemap(onedrive_dir, conn):
+    """
+    Recursively index files in OneDrive by size, building a dict: { size: [list_of_paths] }.
+    Only files whose size matches a Google Photos file ever need to be hashed.
     Skip the duplicates folder itself to avoid re-checking moved files.
+
+    Also returns a dict { path: filehash } of hashes cached in conn for files whose
+    size and mtime are unchanged; rows for changed or removed files are dropped.
     """
+    cached = {
+        path: (size, mtime_ns, filehash)
+        for path, size, mtime_ns, filehash in conn.execute(
+            "SELECT path, size, mtime_ns, hash FROM onedrive"
+        )
+    }
     onedrive_map = {}
-    for fpath in find_files_recursive(onedrive_dir):
+    onedrive_hashes = {}
+    changed = []
+    for entry in find_files_recursive(onedrive_dir):
+        fpath = entry.path
         # Skip the duplicates folder
         if ONEDRIVE_DUPLICATES_DIR in fpath:
             continue
         if any((r"OneDrive\Photos" in fpath, r"OneDrive\Pictures" in fpath)):
-            filehash = compute_file_hash(fpath)
-            if filehash not in onedrive_map:
-                onedrive_map[filehash] = []
-            onedrive_map[filehash].append(fpath)
-            print(f"Created hash for {fpath}")
-    return onedrive_map
+            st = entry.stat()
+            onedrive_map.setdefault(st.st_size, []).append(fpath)
+            row = cached.pop(fpath, None)
+            if row is not None and row[:2] == (st.st_size, st.st_mtime_ns):
+                if row[2] is not None:
+                    onedrive_hashes[fpath] = row[2]
+            else:
+                changed.append((fpath, st.st_size, st.st_mtime_ns))
+
+    # Anything left in cached no longer exists (or is no longer a photo)
+    conn.executemany(
+        "DELETE FROM onedrive WHERE path = ?", ((path,) for path in cached)
+    )
+    conn.executemany(
+        "INSERT OR REPLACE INTO onedrive (path, size, mtime_ns, hash) "
+        "VALUES (?, ?, ?, NULL)",
+        changed,
+    )
+    conn.commit()
+    return onedrive_map, onedrive_hashes
+
+
+def hash_files(paths, hash_cache, conn, executor):
+    """
+    Return the hashes of paths, in order. Files not yet in hash_cache
+    (a dict: { path: filehash }) are hashed on executor (a thread pool shared
+    across calls), added to it, and recorded in the onedrive table of conn
+    (committed by the caller).
+    """
+    missing = [p for p in paths if p not in hash_cache]
+    if len(missing) > 1:
+        new_hashes = list(zip(missing, executor.map(compute_file_hash, missing)))
+    else:
+        new_hashes = [(p, compute_file_hash(p)) for p in missing]
+    if new_hashes:
+        hash_cache.update(new_hashes)
+        conn.executemany(
+            "UPDATE onedrive SET hash = ? WHERE path = ?",
+            ((filehash, path) for path, filehash in new_hashes),
+        )
+    return [hash_cache[p] for p in paths]
 
 
 def process_google_photos_and_dedupe():
@@ -244,68 +667,139 @@ def process_google_photos_and_dedupe():
     3) Read or write EXIF date as needed.
     4) Move the file into a year-based folder under ORGANIZED_PHOTOS_DIR.
     5) Check for duplicates in OneDrive; move the OneDrive file(s) to duplicates if a match.
+       OneDrive is indexed by size, so only same-size files are ever hashed.
+    Hashes, JSON dates and already-organized files are recorded in CACHE_DB
+    between runs.
     """
-    if os.path.getsize("OD.hash") > 0:
-        f = open("OD.hash", "rb")
-        onedrive_map = pickle.load(f)
-        f.close()
-    else:
-        print("Building OneDrive file hash map...")
-        onedrive_map = build_onedrive_hashmap(ONEDRIVE_DIR)
-        f = open("OD.hash", "wb")
-        pickle.dump(onedrive_map, f)
-        f.close()
-        print(f"OneDrive map complete. Found {len(onedrive_map)} unique hashes.\n")
-
-    # Step A: Gather JSON metadata in a dictionary
+    conn = open_cache(CACHE_DB)
+
+    print("Indexing OneDrive files by size...")
+    onedrive_map, onedrive_hashes = build_onedrive_sizemap(ONEDRIVE_DIR, conn)
+    print(f"OneDrive index complete. Found {len(onedrive_map)} distinct sizes.\n")
+
+    # One walk of the unzipped folder, split into JSON metadata and media files
+    print("Scanning unzipped Google Photos directory...")
+    json_paths = []
+    media_entries = []
+    for entry in find_files_recursive(UNZIPPED_TAKEOUT_DIR):
+        if entry.name.lower().endswith(".json"):
+            json_paths.append(entry.path)
+        else:
+            media_entries.append(entry)
+
+    # Step A: Gather JSON metadata in a dictionary. Every sidecar parsed so far
+    # has a row (ts is NULL if it had no date), so an interrupted scan resumes.
+    parsed = set()
     json_dates = {}
-    if os.path.getsize("dates.dict") > 0:
-        f = open("dates.dict", "rb")
-        json_dates = pickle.load(f)
-        f.close()
-    else:
-        print("Scanning unzipped Google Photos directory for JSON files...")
-        for fpath in find_files_recursive(UNZIPPED_TAKEOUT_DIR):
-            if fpath.lower().endswith(".json"):
-                # Potentially a Google Photos metadata file
-                base_file = fpath[:-5]  # remove ".json" to get the corresponding file
-                json_date_utc = get_json_date(fpath)
+    for path, ts in conn.execute("SELECT path, ts FROM takeout_json"):
+        parsed.add(path)
+        if ts is not None:
+            json_dates[path] = datetime.fromtimestamp(ts, _UTC)
+    if not parsed:
+        json_dates = import_legacy_dates(conn, LEGACY_DATES_PICKLE)
+        parsed.update(json_dates)
+        if json_dates:
+            print(f"Imported {len(json_dates)} JSON dates from {LEGACY_DATES_PICKLE}")
+    # Only parse sidecars without a row yet (keyed by path minus ".json")
+    new_json_paths = [p for p in json_paths if p[:-5] not in parsed]
+    if new_json_paths:
+        print(f"Parsing {len(new_json_paths)} JSON files...")
+        rows = []
+        with Pool(os.cpu_count()) as pool:
+            results = pool.imap_unordered(
+                _parse_one_json, new_json_paths, chunksize=256
+            )
+            for base_file, json_date_utc in progress(
+                results, len(new_json_paths), "JSON files"
+            ):
                 if json_date_utc is not None:
                     json_dates[base_file] = json_date_utc
-                    print(base_file)
-
-        f = open("dates.dict", "wb")
-        pickle.dump(json_dates, f)
-        f.close()
+                    rows.append((base_file, int(json_date_utc.timestamp())))
+                else:
+                    rows.append((base_file, None))
+                if len(rows) >= CACHE_BATCH_SIZE:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO takeout_json VALUES (?, ?)", rows
+                    )
+                    conn.commit()
+                    rows = []
+        conn.executemany("INSERT OR REPLACE INTO takeout_json VALUES (?, ?)", rows)
+        conn.commit()
 
     # Step B: For each actual file (non-JSON)
+    organized = dict(conn.execute("SELECT src, path FROM organized"))
+    sidecars = {p[:-5] for p in json_paths}
     print("Processing unzipped Google Photos files (non-JSON) and organizing...")
-    for fpath in find_files_recursive(UNZIPPED_TAKEOUT_DIR):
-        if fpath.lower().endswith(".json"):
-            continue  # skip .json files themselves
-        if fpath.lower().endswith(".jpg"):
-            # 1. Determine JSON-based date if available
-            json_date_utc = json_dates.get(fpath)
-
-            # 2. Read EXIF if present, else write from JSON
-            final_dt = get_final_date_for_file(fpath, json_date_utc)
-        print(f'Moving {fpath.split('\\')[-1]}')
-        # 3. Move file to year-based folder
-        new_path = move_file_to_year_folder(fpath, ORGANIZED_PHOTOS_DIR, final_dt)
-
-        # 4. Check duplicates in OneDrive
-        new_file_hash = compute_file_hash(new_path)
-        if new_file_hash in onedrive_map:
-            # For each OneDrive file that shares this hash, move it to the duplicates folder
-            for dup_path in onedrive_map[new_file_hash]:
-                rel_name = os.path.basename(dup_path)
-                duplicates_target = os.path.join(ONEDRIVE_DUPLICATES_DIR, rel_name)
-                os.makedirs(ONEDRIVE_DUPLICATES_DIR, exist_ok=True)
-                print(f"Moving OneDrive duplicate to {duplicates_target}")
-                shutil.move(dup_path, duplicates_target)
-
-            # Remove that hash from the map to avoid re-checking
-            del onedrive_map[new_file_hash]
+    # One hashing pool for the whole loop, shared by every candidate lookup
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as executor:
+        for i, entry in enumerate(
+            progress(media_entries, len(media_entries), "Photos"), 1
+        ):
+            if i % CACHE_BATCH_SIZE == 0:
+                conn.commit()
+            fpath = entry.path
+            final_dt = None
+            organized_path = organized.get(fpath)
+            if organized_path is not None and os.path.exists(organized_path):
+                # Organized by an earlier run (the zips are re-extracted every run).
+                # That copy already has its date, so skip the EXIF work, drop the
+                # re-extracted copy rather than leave a duplicate behind, and only
+                # re-check the organized copy against OneDrive below.
+                os.remove(fpath)
+                new_path = organized_path
+                candidates = onedrive_map.get(os.path.getsize(new_path))
+                if candidates:
+                    new_file_hash = compute_file_hash(new_path)
+            else:
+                if entry.name.lower().endswith((".jpg", ".jpeg")):
+                    # 1. Determine JSON-based date if available
+                    json_date_utc = json_dates.get(fpath)
+
+                    # 2. Read EXIF if present, else write from JSON
+                    final_dt = get_final_date_for_file(fpath, json_date_utc)
+                # 3. Move file to year-based folder. Only OneDrive files of the same size
+                #    can be duplicates; if there are any, hash the file as it is moved.
+                candidates = onedrive_map.get(os.path.getsize(fpath))
+                if candidates:
+                    new_path, new_file_hash = hash_and_move(
+                        fpath, year_folder_path(fpath, ORGANIZED_PHOTOS_DIR, final_dt)
+                    )
+                else:
+                    new_path = move_file_to_year_folder(
+                        fpath, ORGANIZED_PHOTOS_DIR, final_dt
+                    )
+                # Only remember files whose placement is final: dated, or undated
+                # with no sidecar that could date them on a later run
+                if final_dt is not None or fpath not in sidecars:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO organized VALUES (?, ?)",
+                        (fpath, new_path),
+                    )
+
+            # 4. Check duplicates in OneDrive
+            if candidates:
+                candidate_hashes = hash_files(
+                    candidates, onedrive_hashes, conn, executor
+                )
+                dups = [
+                    p
+                    for p, h in zip(candidates, candidate_hashes)
+                    if h == new_file_hash
+                ]
+                # For each OneDrive file that shares this hash, move it to the duplicates folder
+                for dup_path in dups:
+                    rel_name = os.path.basename(dup_path)
+                    duplicates_target = os.path.join(ONEDRIVE_DUPLICATES_DIR, rel_name)
+                    os.makedirs(ONEDRIVE_DUPLICATES_DIR, exist_ok=True)
+                    tqdm.write(f"Moving OneDrive duplicate to {duplicates_target}")
+                    shutil.move(dup_path, duplicates_target)
+                    # Remove the moved file from the index to avoid re-checking
+                    candidates.remove(dup_path)
+                    del onedrive_hashes[dup_path]
+                    conn.execute("DELETE FROM onedrive WHERE path = ?", (dup_path,))
+
+    conn.commit()
+    conn.close()
 
 
 def main():